@@ -7,7 +7,7 @@ SDG 4 – Quality Education
 Technologies: Cassandra (Data Replication shown via keyspace settings), Python cassandra-driver
 
 Requirements:
-    pip install cassandra-driver
+    pip install cassandra-driver lz4
 
 How to use:
     - Ensure Cassandra is running and accessible (default localhost:9042).
@@ -15,12 +15,34 @@ How to use:
     - Run: python student_record_cassandra.py
 """
 
-from cassandra.cluster import Cluster
-from cassandra.query import SimpleStatement
+from cassandra.cluster import Cluster, ExecutionProfile, EXEC_PROFILE_DEFAULT
+from cassandra.concurrent import execute_concurrent
+from cassandra.connection import Connection, locally_supported_compressions
+from cassandra.policies import TokenAwarePolicy, DCAwareRoundRobinPolicy
+from cassandra.query import BatchStatement, BatchType
+from cassandra.util import uuid_from_time
 from cassandra import ConsistencyLevel
+from collections import defaultdict
+import asyncio
+import atexit
+import datetime
+import os
+import threading
+import time
 import uuid
 import sys
 
+try:
+    # libev reactor is faster than the default asyncore/asyncio one, but needs the C extension
+    from cassandra.io.libevreactor import LibevConnection as _CONNECTION_CLASS
+except ImportError:
+    _CONNECTION_CLASS = None
+
+try:
+    import readline  # noqa: F401 -- gives input() line editing and history on POSIX
+except ImportError:
+    pass
+
 # ---------- Configuration ----------
 CONTACT_POINTS = ['127.0.0.1']   # change to your node(s)
 PORT = 9042
@@ -29,14 +51,136 @@ REPLICATION_STRATEGY = {
     'class': 'SimpleStrategy',   # For multi-datacenter use 'NetworkTopologyStrategy'
     'replication_factor': 1     # set to 3 (or higher) for production clusters
 }
+PROTOCOL_VERSION = 4
+COMPRESSION = 'lz4'              # falls back to the driver's default choice if lz4 isn't installed
+REQUEST_TIMEOUT = 10             # seconds
+LIST_FETCH_SIZE = 1000           # rows per page when listing students
+MAX_BATCH_STATEMENTS = 100       # keep batches well under Cassandra's batch size warn threshold
+# -----------------------------------
+
+# ---------- CQL statements ----------
+# Columns read back for a student; listed explicitly so new columns don't inflate every read
+_COLS = "student_id, student_roll, first_name, last_name, email, dob, course, year, created_at"
+INSERT_CQL = """
+    INSERT INTO students (student_id, student_roll, first_name, last_name, email, dob, course, year, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);
+"""
+INSERT_BY_ROLL_CQL = """
+    INSERT INTO students_by_roll (student_roll, student_id, first_name, last_name, email, dob, course, year, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);
+"""
+INSERT_HISTORY_CQL = """
+    INSERT INTO students_history (student_id, event_id, event, student_roll, first_name, last_name, email, dob, course, year)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+"""
+SELECT_BY_ID_CQL = f"SELECT {_COLS} FROM students WHERE student_id=?"
+SELECT_BY_ROLL_CQL = f"SELECT {_COLS} FROM students_by_roll WHERE student_roll = ?"
+UPDATE_EMAIL_CQL = "UPDATE students SET email = ? WHERE student_id = ?"
+UPDATE_EMAIL_BY_ROLL_CQL = "UPDATE students_by_roll SET email = ? WHERE student_roll = ?"
+LIST_CQL = f"SELECT {_COLS} FROM students LIMIT ?"
+LIST_SINCE_CQL = f"SELECT {_COLS} FROM students WHERE token(student_id) > token(?) LIMIT ?"
+DELETE_CQL = "DELETE FROM students WHERE student_id = ?"
+DELETE_BY_ROLL_CQL = "DELETE FROM students_by_roll WHERE student_roll = ?"
+
+# Every DML statement the module runs; anything else must not go through the prepared cache
+_DML_STATEMENTS = frozenset({
+    INSERT_CQL, INSERT_BY_ROLL_CQL, INSERT_HISTORY_CQL,
+    SELECT_BY_ID_CQL, SELECT_BY_ROLL_CQL, LIST_CQL, LIST_SINCE_CQL,
+    UPDATE_EMAIL_CQL, UPDATE_EMAIL_BY_ROLL_CQL,
+    DELETE_CQL, DELETE_BY_ROLL_CQL,
+})
+# Statements the driver may retry on timeout: each binds every key and value client-side, so
+# a replay writes the same data. Conditional (IF ...), counter, collection-append and now()
+# statements must stay out of this set.
+_IDEMPOTENT = frozenset({
+    INSERT_CQL, INSERT_BY_ROLL_CQL, INSERT_HISTORY_CQL,
+    SELECT_BY_ID_CQL, SELECT_BY_ROLL_CQL, LIST_CQL, LIST_SINCE_CQL,
+    UPDATE_EMAIL_CQL, UPDATE_EMAIL_BY_ROLL_CQL,
+    DELETE_CQL, DELETE_BY_ROLL_CQL,
+})
 # -----------------------------------
 
+# Prepared statements cache, keyed by (session, keyspace, cql) so each query is prepared once per
+# keyspace on each session; a statement prepared through one cluster is never reused by another
+_PREPARED = {}
+
+def _prepared(session, cql):
+    """Return the cached PreparedStatement for cql, preparing it on first use."""
+    key = (session, session.keyspace, cql)
+    stmt = _PREPARED.get(key)
+    if stmt is None:
+        stmt = session.prepare(cql)
+        stmt.is_idempotent = cql in _IDEMPOTENT
+        stmt = _PREPARED.setdefault(key, stmt)
+    return stmt
+
+def _ddl(session, cql):
+    """Execute a schema statement. DDL can't be prepared, so it must not carry bind markers."""
+    assert '?' not in cql, "DDL cannot be prepared; bind markers are not allowed"
+    return session.execute(cql)
+
+def _dml(session, cql):
+    """Return the prepared statement for one of the module-level DML constants."""
+    assert cql in _DML_STATEMENTS, "DML must use a module-level CQL constant"
+    return _prepared(session, cql)
+
 def connect(contact_points=CONTACT_POINTS, port=PORT):
     """Connects to Cassandra cluster and returns (cluster, session)."""
-    cluster = Cluster(contact_points, port=port)
+    # Token-aware routing sends partition-keyed requests straight to a replica
+    profile = ExecutionProfile(
+        load_balancing_policy=TokenAwarePolicy(DCAwareRoundRobinPolicy()),
+        consistency_level=ConsistencyLevel.LOCAL_ONE,
+        request_timeout=REQUEST_TIMEOUT,
+    )
+    compression = COMPRESSION if COMPRESSION in locally_supported_compressions else True
+    kwargs = {'connection_class': _CONNECTION_CLASS} if _CONNECTION_CLASS is not None else {}
+    cluster = Cluster(contact_points, port=port, protocol_version=PROTOCOL_VERSION,
+                      compression=compression, execution_profiles={EXEC_PROFILE_DEFAULT: profile},
+                      **kwargs)
+    # protocol v3+ uses one multiplexed connection per host, so there is no pool size to tune
     session = cluster.connect()
     return cluster, session
 
+# Process-wide cluster/session; build it once via get_session() so every thread shares
+# the same connection pool and prepared statement cache.
+_CLUSTER = None
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+def get_session(contact_points=CONTACT_POINTS, port=PORT):
+    """Return the process-wide session, connecting on first use."""
+    global _CLUSTER, _SESSION
+    if _SESSION is None:
+        with _SESSION_LOCK:
+            if _SESSION is None:
+                _CLUSTER, _SESSION = connect(contact_points, port)
+    return _SESSION
+
+def shutdown_session():
+    """Shut down the process-wide cluster, if one was created."""
+    global _CLUSTER, _SESSION
+    with _SESSION_LOCK:
+        cluster, session = _CLUSTER, _SESSION
+        _CLUSTER = _SESSION = None
+    if session is not None:
+        # list() copies the keys in one step, so concurrent _prepared() inserts can't break the loop
+        for key in [k for k in list(_PREPARED) if k[0] is session]:
+            _PREPARED.pop(key, None)
+    if cluster is not None:
+        cluster.shutdown()
+
+def _reset_after_fork():
+    # The driver's event loop is not fork-safe: children must build their own cluster
+    global _CLUSTER, _SESSION, _SESSION_LOCK
+    _CLUSTER = None
+    _SESSION = None
+    _SESSION_LOCK = threading.Lock()
+    _PREPARED.clear()
+
+atexit.register(shutdown_session)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
 def create_keyspace(session, keyspace=KEYSPACE, replication=REPLICATION_STRATEGY):
     """Creates keyspace with the given replication options if not exists."""
     # build replication map string
@@ -50,7 +194,7 @@ def create_keyspace(session, keyspace=KEYSPACE, replication=REPLICATION_STRATEGY
     CREATE KEYSPACE IF NOT EXISTS {keyspace}
     WITH replication = {repl_str};
     """
-    session.execute(cql)
+    _ddl(session, cql)
     # switch to keyspace
     session.set_keyspace(keyspace)
 
@@ -71,59 +215,401 @@ def create_table(session):
         PRIMARY KEY (student_id)
     );
     """
-    session.execute(cql)
+    _ddl(session, cql)
+    # Denormalized copy keyed by roll so lookups by roll hit a single partition
+    cql = """
+    CREATE TABLE IF NOT EXISTS students_by_roll (
+        student_roll text PRIMARY KEY,
+        student_id uuid,
+        first_name text,
+        last_name text,
+        email text,
+        dob date,
+        course text,
+        year int,
+        created_at timestamp
+    );
+    """
+    _ddl(session, cql)
+    # Change log partitioned by student_id, so its rows share a partition with the students row
+    cql = """
+    CREATE TABLE IF NOT EXISTS students_history (
+        student_id uuid,
+        event_id timeuuid,
+        event text,
+        student_roll text,
+        first_name text,
+        last_name text,
+        email text,
+        dob date,
+        course text,
+        year int,
+        PRIMARY KEY (student_id, event_id)
+    ) WITH CLUSTERING ORDER BY (event_id DESC);
+    """
+    _ddl(session, cql)
+
+def _utcnow():
+    """Current UTC time, used as created_at so the coordinator doesn't evaluate now() per insert."""
+    return datetime.datetime.now(datetime.timezone.utc)
 
 def insert_student(session, student_roll, first_name, last_name, email, dob, course, year):
-    """Insert a new student; returns generated uuid."""
+    """Insert a new student; returns generated uuid.
+
+    Only writes sharing a partition key (e.g. students + students_history for one student_id)
+    are safe to group in an UNLOGGED batch; students_by_roll is a different partition and is
+    always sent as a separate async request. A blank roll can't be a partition key, so such
+    students are only written to students.
+    """
+    sid = uuid.uuid4()
+    created_at = _utcnow()
+    # The two rows live in different partitions, so send them concurrently rather than as a BATCH
+    futures = [
+        session.execute_async(_dml(session, INSERT_CQL).bind(
+            (sid, student_roll, first_name, last_name, email, dob, course, year, created_at))),
+    ]
+    if student_roll:
+        futures.append(session.execute_async(_dml(session, INSERT_BY_ROLL_CQL).bind(
+            (student_roll, sid, first_name, last_name, email, dob, course, year, created_at))))
+    for f in futures:
+        f.result()
+    return sid
+
+def insert_student_with_history(session, student_roll, first_name, last_name, email, dob, course, year):
+    """Insert a new student together with a 'created' history row; returns generated uuid."""
     sid = uuid.uuid4()
-    stmt = session.prepare("""
-        INSERT INTO students (student_id, student_roll, first_name, last_name, email, dob, course, year, created_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, toTimestamp(now()));
-    """)
-    session.execute(stmt, (sid, student_roll, first_name, last_name, email, dob, course, year))
+    created_at = _utcnow()
+    # students and students_history share the student_id partition -> one unlogged batch
+    batch = BatchStatement(batch_type=BatchType.UNLOGGED, consistency_level=ConsistencyLevel.ONE)
+    batch.add(_dml(session, INSERT_CQL),
+              (sid, student_roll, first_name, last_name, email, dob, course, year, created_at))
+    # event_id is a client-side timeuuid (random node bits, not the host MAC)
+    batch.add(_dml(session, INSERT_HISTORY_CQL),
+              (sid, uuid_from_time(time.time()), 'created', student_roll, first_name, last_name, email, dob, course, year))
+    futures = [session.execute_async(batch)]
+    if student_roll:
+        futures.append(session.execute_async(_dml(session, INSERT_BY_ROLL_CQL).bind(
+            (student_roll, sid, first_name, last_name, email, dob, course, year, created_at))))
+    for f in futures:
+        f.result()
     return sid
 
+# Upper bound on requests the bulk helpers keep outstanding at once. On protocol v3+ each host
+# gets a single connection with max_in_flight stream ids; even if every request lands on the same
+# host, half of them stays free for other traffic, so producers never run out of stream ids.
+_BULK_IN_FLIGHT = Connection.max_in_flight // 2
+
+def _throttled_execute_async(session, stmt, semaphore):
+    """execute_async that blocks while semaphore is exhausted; released when the request completes."""
+    semaphore.acquire()
+    future = session.execute_async(stmt)
+    future.add_callbacks(lambda _: semaphore.release(), lambda _: semaphore.release())
+    return future
+
+def safe_batch(session, statements, partition_key_getter):
+    """Execute (prepared_statement, params) pairs, batching only within a partition.
+
+    partition_key_getter is called with each (prepared_statement, params) pair and returns
+    its partition key. Statements sharing a key are sent as UNLOGGED batches of at most
+    MAX_BATCH_STATEMENTS; lone statements are sent individually. Everything is dispatched
+    asynchronously, then awaited.
+    """
+    buckets = defaultdict(list)
+    for item in statements:
+        buckets[partition_key_getter(item)].append(item)
+    semaphore = threading.BoundedSemaphore(_BULK_IN_FLIGHT)
+    futures = []
+    for items in buckets.values():
+        if len(items) == 1:
+            stmt, params = items[0]
+            futures.append(_throttled_execute_async(session, stmt.bind(params), semaphore))
+            continue
+        for i in range(0, len(items), MAX_BATCH_STATEMENTS):
+            batch = BatchStatement(batch_type=BatchType.UNLOGGED)
+            for stmt, params in items[i:i + MAX_BATCH_STATEMENTS]:
+                batch.add(stmt, params)
+            futures.append(_throttled_execute_async(session, batch, semaphore))
+    for f in futures:
+        f.result()
+
+def bulk_insert_students(session, rows, concurrency=100):
+    """Insert many students concurrently.
+
+    rows is an iterable of (student_roll, first_name, last_name, email, dob, course, year) tuples.
+    Returns a list of (uuid, success) pairs in input order.
+    """
+    rows = [(uuid.uuid4(),) + tuple(r) for r in rows]
+    concurrency = min(concurrency, _BULK_IN_FLIGHT)
+    insert_ps = _dml(session, INSERT_CQL)
+    by_roll_ps = _dml(session, INSERT_BY_ROLL_CQL)
+
+    def _statements():
+        # Consumed lazily by execute_concurrent, so created_at is taken when each row is dispatched
+        for sid, roll, fn, ln, email, dob, course, year in rows:
+            created_at = _utcnow()
+            yield insert_ps.bind((sid, roll, fn, ln, email, dob, course, year, created_at)), None
+            if roll:
+                yield by_roll_ps.bind((roll, sid, fn, ln, email, dob, course, year, created_at)), None
+
+    results = iter(execute_concurrent(
+        session, _statements(), concurrency=concurrency, raise_on_first_error=False))
+    out = []
+    for sid, roll, *_ in rows:
+        ok = next(results)[0]
+        # rows without a roll have no students_by_roll write to wait on
+        if roll:
+            ok = next(results)[0] and ok
+        out.append((sid, ok))
+    return out
+
 def get_student(session, student_id):
     """Fetch a student by UUID (student_id)."""
-    stmt = session.prepare("SELECT * FROM students WHERE student_id=?")
+    stmt = _dml(session, SELECT_BY_ID_CQL)
     row = session.execute(stmt, (student_id,)).one()
     return row
 
 def get_student_by_roll(session, student_roll):
-    """Fetch by roll using a simple query (requires ALLOW FILTERING or dedicated index/table in prod)."""
-    # WARNING: ALLOW FILTERING is not recommended for production large tables.
-    cql = "SELECT * FROM students WHERE student_roll = %s ALLOW FILTERING"
-    row = session.execute(cql, (student_roll,)).one()
+    """Fetch a student by roll from the students_by_roll lookup table."""
+    if not student_roll:
+        return None
+    stmt = _dml(session, SELECT_BY_ROLL_CQL)
+    row = session.execute(stmt, (student_roll,)).one()
     return row
 
+def _owns_roll(session, student_roll, student_id):
+    """True if the students_by_roll row for student_roll still points at student_id.
+
+    A later insert with the same roll overwrites the lookup row, and it must then be left alone.
+    This is a plain read before the write, not a transaction: a concurrent insert reusing the
+    roll between the check and the write can still be overwritten.
+    """
+    lookup = get_student_by_roll(session, student_roll)
+    return lookup is not None and lookup.student_id == student_id
+
 def update_student_email(session, student_id, new_email):
-    """Update email of a student."""
-    stmt = session.prepare("UPDATE students SET email = ? WHERE student_id = ?")
-    session.execute(stmt, (new_email, student_id))
+    """Update email of a student (in both students and students_by_roll)."""
+    row = get_student(session, student_id)
+    futures = [session.execute_async(_dml(session, UPDATE_EMAIL_CQL), (new_email, student_id))]
+    if row and row.student_roll and _owns_roll(session, row.student_roll, student_id):
+        futures.append(session.execute_async(_dml(session, UPDATE_EMAIL_BY_ROLL_CQL),
+                                             (new_email, row.student_roll)))
+    for f in futures:
+        f.result()
 
 def delete_student(session, student_id):
-    """Delete a student by UUID."""
-    stmt = session.prepare("DELETE FROM students WHERE student_id = ?")
-    session.execute(stmt, (student_id,))
+    """Delete a student by UUID (from both students and students_by_roll)."""
+    row = get_student(session, student_id)
+    futures = [session.execute_async(_dml(session, DELETE_CQL), (student_id,))]
+    if row and row.student_roll and _owns_roll(session, row.student_roll, student_id):
+        futures.append(session.execute_async(_dml(session, DELETE_BY_ROLL_CQL), (row.student_roll,)))
+    for f in futures:
+        f.result()
 
 def list_students(session, limit=50):
-    """List students (simple scan)."""
-    cql = SimpleStatement("SELECT * FROM students LIMIT %s" % limit, consistency_level=ConsistencyLevel.ONE)
-    rows = session.execute(cql)
-    return list(rows)
+    """List students (simple scan); yields rows lazily, one page at a time."""
+    stmt = _dml(session, LIST_CQL).bind((limit,))
+    stmt.fetch_size = LIST_FETCH_SIZE
+    future = session.execute_async(stmt)
+    rows = future.result().current_rows
+    while True:
+        # Request the next page before handing out this one so the round-trip overlaps the caller's work
+        more = future.has_more_pages
+        if more:
+            future.start_fetching_next_page()
+        for row in rows:
+            yield row
+        if not more:
+            break
+        rows = future.result().current_rows
+
+def list_students_since(session, since_uuid, limit=50):
+    """List up to limit students that come after since_uuid in scan order.
+
+    Pass the student_id of the last row of the previous page to continue a listing
+    without re-reading earlier rows.
+    """
+    stmt = _dml(session, LIST_SINCE_CQL).bind((since_uuid, limit))
+    stmt.fetch_size = LIST_FETCH_SIZE
+    return list(session.execute(stmt))
+
+# ---------- asyncio API ----------
+# Awaitable versions of the helpers for event-loop callers (e.g. a web frontend). They
+# bridge the driver's ResponseFuture onto the running loop, so any connection class works.
+
+def _wrap_future(response_future):
+    """Return an asyncio future resolved with the first page of rows of a driver ResponseFuture.
+
+    Further pages are not fetched, so only use this for single-page results (writes and
+    single-partition lookups).
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def _set_result(rows):
+        if not future.done():
+            future.set_result(rows)
+
+    def _set_exception(exc):
+        if not future.done():
+            future.set_exception(exc)
+
+    response_future.add_callbacks(
+        lambda rows: loop.call_soon_threadsafe(_set_result, rows),
+        lambda exc: loop.call_soon_threadsafe(_set_exception, exc),
+    )
+    return future
+
+async def _dml_async(session, cql):
+    """Awaitable _dml; a cache miss is prepared on the default executor, off the event loop."""
+    assert cql in _DML_STATEMENTS, "DML must use a module-level CQL constant"
+    stmt = _PREPARED.get((session, session.keyspace, cql))
+    if stmt is None:
+        stmt = await asyncio.get_running_loop().run_in_executor(None, _dml, session, cql)
+    return stmt
+
+async def prepare_statements(session):
+    """Prepare every DML statement up front so later async calls never wait on a prepare."""
+    await asyncio.gather(*[_dml_async(session, cql) for cql in _DML_STATEMENTS])
+
+async def _insert_student_async(session, sid, student_roll, first_name, last_name, email, dob, course, year):
+    insert_ps = await _dml_async(session, INSERT_CQL)
+    by_roll_ps = await _dml_async(session, INSERT_BY_ROLL_CQL)
+    created_at = _utcnow()
+    futures = [
+        _wrap_future(session.execute_async(insert_ps.bind(
+            (sid, student_roll, first_name, last_name, email, dob, course, year, created_at)))),
+    ]
+    if student_roll:
+        futures.append(_wrap_future(session.execute_async(by_roll_ps.bind(
+            (student_roll, sid, first_name, last_name, email, dob, course, year, created_at)))))
+    await asyncio.gather(*futures)
+
+async def insert_student_async(session, student_roll, first_name, last_name, email, dob, course, year):
+    """Awaitable insert_student; returns generated uuid."""
+    sid = uuid.uuid4()
+    await _insert_student_async(session, sid, student_roll, first_name, last_name, email, dob, course, year)
+    return sid
+
+async def bulk_insert_students_async(session, rows, concurrency=100):
+    """Awaitable bulk_insert_students; returns a list of (uuid, success) pairs in input order."""
+    semaphore = asyncio.Semaphore(min(concurrency, _BULK_IN_FLIGHT))
+    rows = [(uuid.uuid4(),) + tuple(r) for r in rows]
+
+    async def _insert(row):
+        async with semaphore:
+            await _insert_student_async(session, *row)
+
+    results = await asyncio.gather(*[_insert(r) for r in rows], return_exceptions=True)
+    return [(r[0], not isinstance(res, BaseException)) for r, res in zip(rows, results)]
+
+async def get_student_async(session, student_id):
+    """Awaitable get_student."""
+    stmt = (await _dml_async(session, SELECT_BY_ID_CQL)).bind((student_id,))
+    rows = await _wrap_future(session.execute_async(stmt))
+    return rows[0] if rows else None
+
+async def get_student_by_roll_async(session, student_roll):
+    """Awaitable get_student_by_roll."""
+    if not student_roll:
+        return None
+    stmt = (await _dml_async(session, SELECT_BY_ROLL_CQL)).bind((student_roll,))
+    rows = await _wrap_future(session.execute_async(stmt))
+    return rows[0] if rows else None
+# -----------------------------------
+
+_ROW_FMT = (
+    "student_id : {0.student_id}\n"
+    "roll       : {0.student_roll}\n"
+    "name       : {0.first_name} {0.last_name}\n"
+    "email      : {0.email}\n"
+    "dob        : {0.dob}\n"
+    "course     : {0.course}\n"
+    "year       : {0.year}\n"
+    "created_at : {0.created_at}\n"
+)
 
 def print_row(row):
-    if not row:
+    if row is None:
         print("No record found.")
         return
-    print("student_id :", row.student_id)
-    print("roll       :", getattr(row, 'student_roll', None))
-    print("name       :", f"{getattr(row,'first_name', '')} {getattr(row,'last_name','')}")
-    print("email      :", getattr(row, 'email', None))
-    print("dob        :", getattr(row, 'dob', None))
-    print("course     :", getattr(row, 'course', None))
-    print("year       :", getattr(row, 'year', None))
-    print("created_at :", getattr(row, 'created_at', None))
+    sys.stdout.write(_ROW_FMT.format(row))
+
+def _parse_uuid(s):
+    """Parse s as a UUID; returns None if it isn't one."""
+    try:
+        return uuid.UUID(s.strip())
+    except (ValueError, AttributeError):
+        return None
+
+def _handle_insert(session):
+    roll = input("Roll: ").strip()
+    fn = input("First name: ").strip()
+    ln = input("Last name: ").strip()
+    email = input("Email: ").strip()
+    dob = input("DOB (YYYY-MM-DD) or blank: ").strip() or None
+    course = input("Course: ").strip()
+    year = input("Year (int): ").strip()
+    year = int(year) if year else None
+    sid = insert_student(session, roll, fn, ln, email, dob, course, year)
+    print("Inserted student with UUID:", sid)
+
+def _handle_get(session):
+    sid_uuid = _parse_uuid(input("Student UUID: "))
+    if sid_uuid is None:
+        print("Invalid UUID format.")
+        return
+    row = get_student(session, sid_uuid)
+    print_row(row)
+
+def _handle_get_by_roll(session):
+    roll = input("Student roll: ").strip()
+    row = get_student_by_roll(session, roll)
+    print_row(row)
+
+def _handle_update_email(session):
+    sid_uuid = _parse_uuid(input("Student UUID: "))
+    if sid_uuid is None:
+        print("Invalid UUID format.")
+        return
+    new_email = input("New Email: ").strip()
+    update_student_email(session, sid_uuid, new_email)
+    print("Updated email.")
+
+def _handle_delete(session):
+    sid_uuid = _parse_uuid(input("Student UUID: "))
+    if sid_uuid is None:
+        print("Invalid UUID format.")
+        return
+    delete_student(session, sid_uuid)
+    print("Deleted (if existed).")
+
+def _handle_list(session):
+    count = 0
+    for r in list_students(session, limit=100):
+        print("------------------------------")
+        print_row(r)
+        count += 1
+    print("Total shown:", count)
+
+def _handle_exit(session):
+    print("Exiting.")
+    return True
+
+def _handle_invalid(session):
+    print("Invalid choice.")
+
+# Menu choice -> handler; a handler returning True ends the CLI loop
+DISPATCH = {
+    '1': _handle_insert,
+    '2': _handle_get,
+    '3': _handle_get_by_roll,
+    '4': _handle_update_email,
+    '5': _handle_delete,
+    '6': _handle_list,
+    '7': _handle_exit,
+    'exit': _handle_exit,
+    'q': _handle_exit,
+}
 
 def interactive_cli(session):
     """Very small CLI to demo CRUD operations."""
@@ -132,7 +618,7 @@ def interactive_cli(session):
     Choose an option:
       1) Insert student
       2) Get student by UUID
-      3) Get student by roll (ALLOW FILTERING demo)
+      3) Get student by roll
       4) Update student email
       5) Delete student
       6) List students
@@ -140,66 +626,14 @@ def interactive_cli(session):
     """
     while True:
         print(MENU)
-        choice = input("Enter choice: ").strip()
-        if choice == '1':
-            roll = input("Roll: ").strip()
-            fn = input("First name: ").strip()
-            ln = input("Last name: ").strip()
-            email = input("Email: ").strip()
-            dob = input("DOB (YYYY-MM-DD) or blank: ").strip() or None
-            course = input("Course: ").strip()
-            year = input("Year (int): ").strip()
-            year = int(year) if year else None
-            sid = insert_student(session, roll, fn, ln, email, dob, course, year)
-            print("Inserted student with UUID:", sid)
-        elif choice == '2':
-            sid = input("Student UUID: ").strip()
-            try:
-                sid_uuid = uuid.UUID(sid)
-            except Exception:
-                print("Invalid UUID format.")
-                continue
-            row = get_student(session, sid_uuid)
-            print_row(row)
-        elif choice == '3':
-            roll = input("Student roll: ").strip()
-            row = get_student_by_roll(session, roll)
-            print_row(row)
-        elif choice == '4':
-            sid = input("Student UUID: ").strip()
-            new_email = input("New Email: ").strip()
-            try:
-                sid_uuid = uuid.UUID(sid)
-            except Exception:
-                print("Invalid UUID format.")
-                continue
-            update_student_email(session, sid_uuid, new_email)
-            print("Updated email.")
-        elif choice == '5':
-            sid = input("Student UUID: ").strip()
-            try:
-                sid_uuid = uuid.UUID(sid)
-            except Exception:
-                print("Invalid UUID format.")
-                continue
-            delete_student(session, sid_uuid)
-            print("Deleted (if existed).")
-        elif choice == '6':
-            rows = list_students(session, limit=100)
-            for r in rows:
-                print("------------------------------")
-                print_row(r)
-            print("Total shown:", len(rows))
-        elif choice == '7' or choice.lower() in ('exit', 'q'):
-            print("Exiting.")
+        choice = input("Enter choice: ").strip().lower()
+        if DISPATCH.get(choice, _handle_invalid)(session):
             break
-        else:
-            print("Invalid choice.")
 
 def main():
     print("Connecting to Cassandra at", CONTACT_POINTS)
     try:
-        cluster, session = connect()
+        session = get_session()
     except Exception as e:
         print("Error connecting to Cassandra:", e)
         sys.exit(1)
@@ -207,12 +641,11 @@ def main():
     try:
         create_keyspace(session)
         create_table(session)
-        print(f"Keyspace '{KEYSPACE}' and table 'students' are ready.")
+        print(f"Keyspace '{KEYSPACE}' and tables 'students', 'students_by_roll', 'students_history' are ready.")
         interactive_cli(session)
     finally:
         try:
-            session.shutdown()
-            cluster.shutdown()
+            shutdown_session()
         except Exception:
             pass
 
@@ -0,0 +1,43 @@
+import re
+import unittest
+
+import Code
+
+CQL_CONSTANTS = {name: getattr(Code, name) for name in dir(Code) if name.endswith('_CQL')}
+
+# A bind marker must follow a column comparison/assignment, sit inside token(), or follow LIMIT
+_MARKER_IN_CONTEXT = re.compile(r"\w+\s*(?:=|>|<)\s*\?|token\(\?\)|LIMIT\s+\?")
+
+
+class CqlShapeTest(unittest.TestCase):
+
+    def test_constants_found(self):
+        self.assertEqual(set(CQL_CONSTANTS.values()), Code._DML_STATEMENTS)
+
+    def test_insert_markers_match_columns(self):
+        for name, cql in CQL_CONSTANTS.items():
+            if not cql.strip().upper().startswith('INSERT'):
+                continue
+            with self.subTest(name=name):
+                columns, values = re.findall(r"\(([^)]*)\)", cql)
+                columns = [c.strip() for c in columns.split(',')]
+                values = [v.strip() for v in values.split(',')]
+                self.assertEqual(len(values), len(columns))
+                self.assertEqual(cql.count('?'), len(columns))
+
+    def test_other_markers_are_bound_to_a_column(self):
+        for name, cql in CQL_CONSTANTS.items():
+            if cql.strip().upper().startswith('INSERT'):
+                continue
+            with self.subTest(name=name):
+                self.assertEqual(cql.count('?'), len(_MARKER_IN_CONTEXT.findall(cql)))
+
+    def test_idempotent_statements_are_unconditional(self):
+        for cql in Code._IDEMPOTENT:
+            with self.subTest(cql=cql):
+                self.assertIn(cql, Code._DML_STATEMENTS)
+                self.assertNotRegex(cql.upper(), r"\bIF\b|NOW\(\)")
+
+
+if __name__ == '__main__':
+    unittest.main()
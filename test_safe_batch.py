@@ -0,0 +1,64 @@
+import unittest
+
+from cassandra.query import BatchStatement, BatchType, SimpleStatement
+
+import Code
+
+
+class _Statement(SimpleStatement):
+    """SimpleStatement that can also be bound, standing in for a PreparedStatement."""
+
+    def bind(self, params):
+        return ('bound', self, params)
+
+
+class _Future:
+    def add_callbacks(self, callback, errback):
+        callback(None)
+
+    def result(self):
+        return None
+
+
+class _Session:
+    def __init__(self):
+        self.sent = []
+
+    def execute_async(self, stmt):
+        self.sent.append(stmt)
+        return _Future()
+
+
+INSERT = _Statement("INSERT INTO t (k, v) VALUES (%s, %s)")
+
+
+class SafeBatchTest(unittest.TestCase):
+
+    def run_safe_batch(self, statements):
+        session = _Session()
+        Code.safe_batch(session, statements, lambda item: item[1][0])
+        return session.sent
+
+    def test_singleton_goes_through_execute_async(self):
+        sent = self.run_safe_batch([(INSERT, (1, 'a')), (INSERT, (2, 'b'))])
+        self.assertEqual(sent, [('bound', INSERT, (1, 'a')), ('bound', INSERT, (2, 'b'))])
+
+    def test_same_partition_becomes_unlogged_batch(self):
+        sent = self.run_safe_batch([(INSERT, (1, 'a')), (INSERT, (2, 'b')), (INSERT, (1, 'c'))])
+        batches = [s for s in sent if isinstance(s, BatchStatement)]
+        self.assertEqual(len(sent), 2)
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(batches[0].batch_type, BatchType.UNLOGGED)
+        self.assertEqual(len(batches[0]), 2)
+        self.assertIn(('bound', INSERT, (2, 'b')), sent)
+
+    def test_large_bucket_is_split(self):
+        n = Code.MAX_BATCH_STATEMENTS * 2 + 1
+        sent = self.run_safe_batch([(INSERT, (1, str(i))) for i in range(n)])
+        self.assertTrue(all(isinstance(s, BatchStatement) for s in sent))
+        self.assertEqual([len(b) for b in sent],
+                         [Code.MAX_BATCH_STATEMENTS, Code.MAX_BATCH_STATEMENTS, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()